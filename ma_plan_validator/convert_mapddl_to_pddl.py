@@ -1,21 +1,37 @@
 #!/usr/bin/env python3
+# cython: language_level=3
 
 import sys
-import os
-
-DFILE_KEYWORDS = [
-    "requirements",
-    "types",
-    "predicates",
-    "action",
-    "private",
-    "functions",
-    "constants",
-]
-DFILE_REQ_KEYWORDS = ["typing", "strips", "multi-agent", "unfactored-privacy"]
-DFILE_SUBKEYWORDS = ["parameters", "precondition", "effect", "duration"]
-PFILE_KEYWORDS = ["objects", "init", "goal", "private", "metric"]
-AFILE_KEYWORDS = ["agents"]
+import re
+from collections import defaultdict, deque
+from io import StringIO
+
+DFILE_KEYWORDS = frozenset(
+    {
+        "requirements",
+        "types",
+        "predicates",
+        "action",
+        "private",
+        "functions",
+        "constants",
+    }
+)
+DFILE_REQ_KEYWORDS = frozenset({"typing", "strips", "multi-agent", "unfactored-privacy"})
+DFILE_SUBKEYWORDS = frozenset({"parameters", "precondition", "effect", "duration"})
+PFILE_KEYWORDS = frozenset({"objects", "init", "goal", "private", "metric"})
+AFILE_KEYWORDS = frozenset({"agents"})
+# Multi-agent requirements dropped from the centralized domain
+MA_REQ_KEYWORDS = frozenset({"multi-agent", "unfactored-privacy"})
+
+DOMAIN_HEADER = ("(", "define", "(", "domain")
+PROBLEM_HEADER = ("(", "define", "(", "problem")
+PROBLEM_DOMAIN_HEADER = (")", "(", ":domain")
+
+# Comments run from ';' to end of line, parentheses are tokens on their own.
+# Only tokens are captured, comments match the empty group and are dropped.
+# Tokens are never empty, so the parsers can safely test word[0].
+TOKEN_RE = re.compile(r";[^\n]*|([()]|[^\s();]+)")
 
 verbose = False
 
@@ -25,39 +41,51 @@ class Predicate:
 
     Without a name it is a parameter list.
     It can be typed (or not).
-      If typed then args = [[var, type], ...]
-      Else args = [var, ...]
+      If typed then args = ((var, type), ...)
+      Else args = (var, ...)
     It can be negated.
     It may contain variables or objects in its arguments.
     """
 
+    __slots__ = (
+        "name",
+        "args",
+        "arity",
+        "is_typed",
+        "is_negated",
+        "ground_facts",
+        "agent_param",
+        "_rep",
+    )
+
     def __init__(self, name, args, is_typed, is_negated):
         self.name = name
-        self.args = args
-        self.arity = len(args)
+        self.args = tuple(args)
+        self.arity = len(self.args)
         self.is_typed = is_typed
         self.is_negated = is_negated
-        self.ground_facts = set()
+        self.ground_facts = None
         self.agent_param = -1
+        self._rep = None
 
     def pddl_rep(self):
-        """Returns the PDDL version of the instance."""
-        rep = ""
-        if self.is_negated:
-            rep += "(not "
-        if self.name != "":
-            rep += "(" + self.name + " "
+        """Returns the PDDL version of the instance.
+
+        Predicates are not modified once parsed, so the result is cached.
+        """
+        if self._rep is None:
+            self._rep = self._build_pddl_rep()
+        return self._rep
+
+    def _build_pddl_rep(self):
+        words = [self.name] if self.name != "" else []
+        if self.is_typed:
+            words.extend(argument[0] + " - " + argument[1] for argument in self.args)
         else:
-            rep += "("
-        for argument in self.args:
-            if self.is_typed:
-                rep += argument[0] + " - " + argument[1] + " "
-            else:
-                rep += argument + " "
-        rep = rep[:-1]
-        rep += ")"
+            words.extend(self.args)
+        rep = "(" + " ".join(words) + ")"
         if self.is_negated:
-            rep += ")"
+            rep = "(not " + rep + ")"
         return rep
 
     def __repr__(self):
@@ -67,6 +95,16 @@ class Predicate:
 class Action:
     """Represents a simple non-temporal action."""
 
+    __slots__ = (
+        "name",
+        "parameters",
+        "precondition",
+        "effect",
+        "duration",
+        "agent",
+        "agent_type",
+    )
+
     def __init__(self, name, parameters, precondition, effect):
         self.name = name
         self.parameters = parameters
@@ -78,73 +116,69 @@ class Action:
 
     def pddl_rep(self):
         """Returns the PDDL version of the instance."""
-        rep = ""
-        rep += "(:action " + self.name + "\n"
-        rep += "\t:parameters " + str(self.parameters) + "\n"
+        pre = "".join(f"\t\t{precon}\n" for precon in self.precondition)
         if len(self.precondition) > 1:
-            rep += "\t:precondition (and\n"
+            pre = f"\t:precondition (and\n{pre}\t)\n"
         else:
-            rep += "\t:precondition \n"
-        for precon in self.precondition:
-            rep += "\t\t" + str(precon) + "\n"
-        if len(self.precondition) > 1:
-            rep += "\t)\n"
+            pre = f"\t:precondition\n{pre}"
+        eff = "".join(f"\t\t{effect}\n" for effect in self.effect)
         if len(self.effect) > 1:
-            rep += "\t:effect (and\n"
+            eff = f"\t:effect (and\n{eff}\t)\n"
         else:
-            rep += "\t:effect \n"
-        for eff in self.effect:
-            rep += "\t\t" + str(eff) + "\n"
-        if len(self.effect) > 1:
-            rep += "\t)\n"
-        rep += ")\n"
-        return rep
+            eff = f"\t:effect\n{eff}"
+        return f"(:action {self.name}\n\t:parameters {self.parameters}\n{pre}{eff})\n"
 
     def __repr__(self):
         return self.name  # + str(self.parameters)
 
 
 class Function:
+    __slots__ = ("obj_list",)
+
     def __init__(self, obj_list):
         self.obj_list = obj_list
 
     def pddl_rep(self):
         """Returns the PDDL version of the instance."""
-        rep = "("
-        for argument in self.obj_list:
-            rep += argument + " "
-        rep = rep[:-1]
-        rep += ") - number"
-        return rep
+        return "(" + " ".join(self.obj_list) + ") - number"
 
     def __repr__(self):
         return self.pddl_rep()
 
 
 class GroundFunction:
+    __slots__ = ("obj_list",)
+
     def __init__(self, obj_list):
         self.obj_list = obj_list
 
     def pddl_rep(self):
         """Returns the PDDL version of the instance."""
-        rep = "(" + self.obj_list[0] + " ("
-        for argument in self.obj_list[1:-1]:
-            rep += argument + " "
-        rep = rep[:-1]
-        rep += ") " + self.obj_list[-1] + ") "
-        return rep
+        args = " ".join(self.obj_list[1:-1])
+        return "(" + self.obj_list[0] + " (" + args + ") " + self.obj_list[-1] + ") "
 
     def __repr__(self):
         return self.pddl_rep()
 
 
+class _DomainParseState:
+    """Mutable state shared by the parse_domain token handlers."""
+
+    __slots__ = ("keyword", "obj_list", "is_obj_list")
+
+    def __init__(self):
+        self.keyword = ""
+        self.obj_list = []
+        self.is_obj_list = True
+
+
 class PlanningProblem:
     def __init__(self, domainfile, problemfile):
         self.domain = ""  # String
         self.requirements = set()  # [String]
         self.type_list = set()  # {String}
         self.type_list.add("object")
-        self.types = {}  # Key = supertype_name, Value = type
+        self.types = defaultdict(list)  # Key = supertype_name, Value = type
         self.predicates = []  # [Predicate]
         self.functions = []
         self.ground_functions = []
@@ -153,8 +187,10 @@ class PlanningProblem:
         self.agents = set()
         self.problem = ""  # String
         self.object_list = set()  # {String}
-        self.objects = {}  # Key = type, Value = object_name
-        self.constants = {}  # Key = type, Value = object_name
+        self.objects = defaultdict(list)  # Key = type, Value = object_name
+        self.constants = defaultdict(list)  # Key = type, Value = object_name
+        self.object_types = {}  # Key = object_name, Value = type
+        self.objects_of_type = {}  # Key = type, Value = frozenset of object_name
         self.init = []  # List of Predicates
         self.goal = []  # List of Predicates
         self.metric = False
@@ -162,123 +198,58 @@ class PlanningProblem:
         self.parse_domain(domainfile)
         self.parse_problem(problemfile)
 
+        # Objects take precedence over constants, first declared type wins
+        for typed_objects in (self.objects, self.constants):
+            for t, objs in typed_objects.items():
+                for obj in objs:
+                    self.object_types.setdefault(obj, t)
+
         for t in self.agent_types:
             self.agents = self.agents | self.get_objects_of_type(t)
 
-        self.requirements = self.requirements - {"multi-agent", "unfactored-privacy"}
+        self.requirements -= MA_REQ_KEYWORDS
 
     def parse_domain(self, domainfile):
-        """Parses a PDDL domain file."""
+        """Parses a PDDL domain file, given as a path or an open text stream."""
 
-        with open(domainfile) as dfile:
-            dfile_array = self._get_file_as_array(dfile)
+        dfile_array = self._read_tokens(domainfile)
         # Deal with front/end define, problem, :domain
-        if dfile_array[0:4] != ["(", "define", "(", "domain"]:
+        if tuple(dfile_array[0:4]) != DOMAIN_HEADER:
             print("PARSING ERROR: Expected (define (domain ... at start of domain file")
             sys.exit()
         self.domain = dfile_array[4]
 
         dfile_array = dfile_array[6:-1]
         opencounter = 0
-        keyword = ""
-        obj_list = []
-        is_obj_list = True
+        state = _DomainParseState()
+        handler = None
+        types = self.types
+        type_list = self.type_list
+        actions = self.actions
+        handlers = self._DOMAIN_TOKEN_HANDLERS
         for word in dfile_array:
             if word == "(":
                 opencounter += 1
             elif word == ")":
                 opencounter -= 1
-            elif word.startswith(":"):
-                if word[1:] not in DFILE_KEYWORDS:
-                    pass
-                elif keyword != "requirements":
-                    keyword = word[1:]
+            elif word[0] == ":":
+                if word[1:] in DFILE_KEYWORDS and state.keyword != "requirements":
+                    # Interned, so comparing keyword to literals is a pointer check
+                    state.keyword = sys.intern(word[1:])
+                    handler = handlers[state.keyword]
             if opencounter == 0:
-                if keyword == "action":
-                    self.actions.append(obj_list)
-                    obj_list = []
-                if keyword == "types":
-                    for element in obj_list:
-                        self.types.setdefault("object", []).append(element)
-                        self.type_list.add("object")
-                        self.type_list.add(element)
-                    obj_list = []
-                keyword = ""
-
-            if keyword == "requirements":  # Requirements list
-                if word != ":requirements":
-                    if not word.startswith(":"):
-                        print("PARSING ERROR: Expected requirement to start with :")
-                        sys.exit()
-                    elif word[1:] not in DFILE_REQ_KEYWORDS:
-                        print("WARNING: Unknown Requirement " + word[1:])
-                    else:
-                        self.requirements.add(word[1:])
-            elif keyword == "action":
-                obj_list.append(word)
-            elif not word.startswith(":"):
-                if keyword == "types":  # Typed list of objects
-                    if is_obj_list:
-                        if word == "-":
-                            is_obj_list = False
-                        else:
-                            obj_list.append(word)
-                    else:
-                        # word is type
-                        for element in obj_list:
-                            if not word in self.type_list:
-                                self.types.setdefault("object", []).append(word)
-                                self.type_list.add(word)
-                            self.types.setdefault(word, []).append(element)
-                            self.type_list.add(element)
-                            self.type_list.add(word)
-                        is_obj_list = True
-                        obj_list = []
-                elif keyword == "constants":  # Typed list of objects
-                    if is_obj_list:
-                        if word == "-":
-                            is_obj_list = False
-                        else:
-                            obj_list.append(word)
-                    else:
-                        # word is type
-                        for element in obj_list:
-                            if word in self.type_list:
-                                self.constants.setdefault(word, []).append(element)
-                            else:
-                                print(self.type_list)
-                                print("ERROR unknown type " + word)
-                                sys.exit()
-                        is_obj_list = True
-                        obj_list = []
-                elif (
-                    keyword == "predicates" or keyword == "private"
-                ):  # Internally typed predicates
-                    if word == ")":
-                        if keyword == "private":
-                            obj_list = obj_list[3:]
-                            keyword = "predicates"
-                        if len(obj_list) == 0:
-                            continue
-                        p_name = obj_list[0]
-                        pred_list = self._parse_name_type_pairs(
-                            obj_list[1:], self.type_list
-                        )
-                        self.predicates.append(
-                            Predicate(p_name, pred_list, True, False)
-                        )
-                        obj_list = []
-                    elif word != "(":
-                        obj_list.append(word)
-                elif keyword == "functions":  # functions
-                    if word == ")":
-                        p_name = obj_list[0]
-                        if obj_list[0] == "-":
-                            obj_list = obj_list[2:]
-                        self.functions.append(Function(obj_list))
-                        obj_list = []
-                    elif word != "(":
-                        obj_list.append(word)
+                if state.keyword == "action":
+                    actions.append(state.obj_list)
+                    state.obj_list = []
+                if state.keyword == "types":
+                    types["object"].extend(state.obj_list)
+                    type_list.update(state.obj_list)
+                    state.obj_list = []
+                state.keyword = ""
+                handler = None
+
+            if handler is not None:
+                handler(self, word, state)
 
         # Work on the actions
         new_actions = []
@@ -286,14 +257,14 @@ class PlanningProblem:
             if action[0] == "-":
                 action = action[2:]
             act_name = action[1]
-            act = {}
+            act = defaultdict(list)
             action = action[2:]
             keyword = ""
             for word in action:
-                if word.startswith(":"):
-                    keyword = word[1:]
+                if word[0] == ":":
+                    keyword = sys.intern(word[1:])
                 else:
-                    act.setdefault(keyword, []).append(word)
+                    act[keyword].append(word)
             self.agent_types.add(act.get("agent")[2])
             agent = self._parse_name_type_pairs(act.get("agent"), self.type_list)
             param_list = agent + self._parse_name_type_pairs(
@@ -306,20 +277,21 @@ class PlanningProblem:
 
             new_actions.append(new_act)
         self.actions = new_actions
+        self.types = dict(self.types)
+        self.constants = dict(self.constants)
 
     def parse_problem(self, problemfile):
-        """The main method for parsing a PDDL files."""
+        """The main method for parsing a PDDL files, given as paths or open text streams."""
 
-        with open(problemfile) as pfile:
-            pfile_array = self._get_file_as_array(pfile)
+        pfile_array = self._read_tokens(problemfile)
         # Deal with front/end define, problem, :domain
-        if pfile_array[0:4] != ["(", "define", "(", "problem"]:
+        if tuple(pfile_array[0:4]) != PROBLEM_HEADER:
             print(
                 "PARSING ERROR: Expected (define (problem ... at start of problem file"
             )
             sys.exit()
         self.problem = pfile_array[4]
-        if pfile_array[5:8] != [")", "(", ":domain"]:
+        if tuple(pfile_array[5:8]) != PROBLEM_DOMAIN_HEADER:
             print("PARSING ERROR: Expected (:domain ...) after (define (problem ...)")
             sys.exit()
         if self.domain != pfile_array[8]:
@@ -336,6 +308,11 @@ class PlanningProblem:
         obj_list = []
         int_obj_list = []
         int_opencounter = 0
+        objects = self.objects
+        object_list = self.object_list
+        init = self.init
+        ground_functions = self.ground_functions
+        type_list = self.type_list
         for word in pfile_array:
             if word == "(":
                 opencounter += 1
@@ -343,16 +320,16 @@ class PlanningProblem:
                 if keyword == "objects":
                     obj_list = []
                 opencounter -= 1
-            elif word.startswith(":"):
+            elif word[0] == ":":
                 if word[1:] not in PFILE_KEYWORDS:
                     print("PARSING ERROR: Unknown keyword: " + word[1:])
-                    print("Known keywords: " + str(PFILE_KEYWORDS))
+                    print("Known keywords: " + str(sorted(PFILE_KEYWORDS)))
                 else:
-                    keyword = word[1:]
+                    keyword = sys.intern(word[1:])
             if opencounter == 0:
                 keyword = ""
 
-            if not word.startswith(":"):
+            if word[0] != ":":
                 if (
                     keyword == "objects" or keyword == "private"
                 ):  # Typed list of objects
@@ -368,11 +345,11 @@ class PlanningProblem:
                     else:
                         # word is type
                         for element in obj_list:
-                            if word in self.type_list:
-                                self.objects.setdefault(word, []).append(element)
-                                self.object_list.add(element)
+                            if word in type_list:
+                                objects[word].append(element)
+                                object_list.add(element)
                             else:
-                                print(self.type_list)
+                                print(type_list)
                                 print("ERROR unknown type " + word)
                                 sys.exit()
                         is_obj_list = True
@@ -383,10 +360,10 @@ class PlanningProblem:
                             is_function = True
                         else:
                             if is_function:
-                                self.ground_functions.append(GroundFunction(obj_list))
+                                ground_functions.append(GroundFunction(obj_list))
                                 is_function = False
                             else:
-                                self.init.append(
+                                init.append(
                                     Predicate(obj_list[0], obj_list[1:], False, False)
                                 )
                             obj_list = []
@@ -404,29 +381,31 @@ class PlanningProblem:
                 elif keyword == "metric":
                     self.metric = True
                     obj_list = []
+        self.objects = dict(self.objects)
 
     def get_type_of_object(self, obj):
-        for t in self.objects.keys():
-            if obj in self.objects[t]:
-                return t
-        for t in self.constants.keys():
-            if obj in self.constants[t]:
-                return t
+        return self.object_types.get(obj)
 
     def get_objects_of_type(self, of_type):
+        selected_objects = self.objects_of_type.get(of_type)
+        if selected_objects is not None:
+            return selected_objects
         selected_types = {of_type}
-        pre_size = 0
-        while len(selected_types) > pre_size:
-            pre_size = len(selected_types)
-            for t in selected_types:
-                if t in self.types:
-                    selected_types = selected_types | set(self.types[t])
+        queue = deque([of_type])
+        while queue:
+            t = queue.popleft()
+            for subtype in self.types.get(t, ()):
+                if subtype not in selected_types:
+                    selected_types.add(subtype)
+                    queue.append(subtype)
         selected_objects = set()
         for t in selected_types:
             if t in self.objects:
-                selected_objects = selected_objects | set(self.objects[t])
+                selected_objects.update(self.objects[t])
             if t in self.constants:
-                selected_objects = selected_objects | set(self.constants[t])
+                selected_objects.update(self.constants[t])
+        selected_objects = frozenset(selected_objects)
+        self.objects_of_type[of_type] = selected_objects
         return selected_objects
 
     def print_domain(self):
@@ -449,129 +428,228 @@ class PlanningProblem:
         print("AGENTS: " + str(self.agents))
         print("****************")
 
-    # Get string of file with comments removed - comments are rest of line after ';'
+    # Get list of tokens of file with comments removed - comments are rest of line after ';'
     def _get_file_as_array(self, file_):
-        file_as_string = ""
-        for line in file_:
-            if ";" in line:
-                line = line[: line.find(";")]
-            line = (
-                line.replace("\t", "")
-                .replace("\n", " ")
-                .replace("(", " ( ")
-                .replace(")", " ) ")
-            )
-            file_as_string += line
-        file_.close()
-        return file_as_string.strip().split()
+        return list(filter(None, TOKEN_RE.findall(file_.read())))
+
+    def _read_tokens(self, source):
+        if hasattr(source, "read"):
+            return self._get_file_as_array(source)
+        with open(source) as file_:
+            return self._get_file_as_array(file_)
+
+    # Domain token handlers, dispatched on the current keyword by parse_domain
+    def _parse_requirements_token(self, word, state):
+        if word == ":requirements":
+            return
+        if word[0] != ":":
+            print("PARSING ERROR: Expected requirement to start with :")
+            sys.exit()
+        elif word[1:] not in DFILE_REQ_KEYWORDS:
+            print("WARNING: Unknown Requirement " + word[1:])
+        else:
+            self.requirements.add(word[1:])
+
+    def _parse_action_token(self, word, state):
+        state.obj_list.append(word)
+
+    def _parse_types_token(self, word, state):  # Typed list of objects
+        if word[0] == ":":
+            return
+        if state.is_obj_list:
+            if word == "-":
+                state.is_obj_list = False
+            else:
+                state.obj_list.append(word)
+        else:
+            # word is type
+            obj_list = state.obj_list
+            if obj_list:
+                if word not in self.type_list:
+                    self.types["object"].append(word)
+                    self.type_list.add(word)
+                self.types[word].extend(obj_list)
+                self.type_list.update(obj_list)
+            state.is_obj_list = True
+            state.obj_list = []
+
+    def _parse_constants_token(self, word, state):  # Typed list of objects
+        if word[0] == ":":
+            return
+        if state.is_obj_list:
+            if word == "-":
+                state.is_obj_list = False
+            else:
+                state.obj_list.append(word)
+        else:
+            # word is type
+            if state.obj_list:
+                if word not in self.type_list:
+                    print(self.type_list)
+                    print("ERROR unknown type " + word)
+                    sys.exit()
+                self.constants[word].extend(state.obj_list)
+            state.is_obj_list = True
+            state.obj_list = []
+
+    def _parse_predicates_token(self, word, state):  # Internally typed predicates
+        if word[0] == ":":
+            return
+        if word == ")":
+            if state.keyword == "private":
+                state.obj_list = state.obj_list[3:]
+                state.keyword = "predicates"
+            obj_list = state.obj_list
+            if len(obj_list) == 0:
+                return
+            pred_list = self._parse_name_type_pairs(obj_list[1:], self.type_list)
+            self.predicates.append(Predicate(obj_list[0], pred_list, True, False))
+            state.obj_list = []
+        elif word != "(":
+            state.obj_list.append(word)
+
+    def _parse_functions_token(self, word, state):
+        if word[0] == ":":
+            return
+        if word == ")":
+            obj_list = state.obj_list
+            if obj_list[0] == "-":
+                obj_list = obj_list[2:]
+            self.functions.append(Function(obj_list))
+            state.obj_list = []
+        elif word != "(":
+            state.obj_list.append(word)
+
+    _DOMAIN_TOKEN_HANDLERS = {
+        "requirements": _parse_requirements_token,
+        "action": _parse_action_token,
+        "types": _parse_types_token,
+        "constants": _parse_constants_token,
+        "predicates": _parse_predicates_token,
+        "private": _parse_predicates_token,
+        "functions": _parse_functions_token,
+    }
 
     def _parse_name_type_pairs(self, array, types):
         pred_list = []
         if len(array) % 3 != 0:
             print("Expected predicate to be typed " + str(array))
             sys.exit()
-        for i in range(0, int(len(array) / 3)):
-            if array[3 * i + 1] != "-":
+        for i in range(0, len(array), 3):
+            name, dash, type_ = array[i], array[i + 1], array[i + 2]
+            if dash != "-":
                 print("Expected predicate to be typed")
                 sys.exit()
-            if array[3 * i + 2] in types:
-                pred_list.append((array[3 * i], array[3 * i + 2]))
+            if type_ in types:
+                pred_list.append((name, type_))
             else:
-                print("PARSING ERROR {} not in types list".format(array[3 * i + 2]))
+                print("PARSING ERROR {} not in types list".format(type_))
                 print("Types list: {}".format(self.type_list))
                 sys.exit()
         return pred_list
 
-    def _parse_unground_proposition(self, array):
-        negative = False
-        if array[1] == "not":
-            negative = True
-            array = array[2:-1]
-        return Predicate(array[1], array[2:-1], False, negative)
+    # Parses the proposition in array[start:end], parentheses included
+    def _parse_unground_proposition(self, array, start, end):
+        if array[start + 1] == "not":
+            # ( not ( name args... ) )
+            return Predicate(array[start + 3], array[start + 4 : end - 2], False, True)
+        return Predicate(array[start + 1], array[start + 2 : end - 1], False, False)
 
     def _parse_unground_propositions(self, array):
         prop_list = []
+        start = 0
+        end = len(array)
         if array[0:3] == ["(", "and", "("]:
-            array = array[2:-1]
+            start = 2
+            end -= 1
         opencounter = 0
-        prop = []
-        for word in array:
+        prop_start = start
+        for i in range(start, end):
+            word = array[i]
             if word == "(":
                 opencounter += 1
-            if word == ")":
+            elif word == ")":
                 opencounter -= 1
-            prop.append(word)
-            if opencounter == 0:
-                prop_list.append(self._parse_unground_proposition(prop))
-                prop = []
+                if opencounter == 0:
+                    prop_list.append(
+                        self._parse_unground_proposition(array, prop_start, i + 1)
+                    )
+                    prop_start = i + 1
         return prop_list
 
     def write_pddl_domain(self, output_file):
-        file_ = open(output_file, "w")
-        to_write = "(define (domain " + self.domain + ")\n"
+        with open(output_file, "w") as file_:
+            self._write_pddl_domain(file_)
+
+    def write_pddl_problem(self, output_file):
+        with open(output_file, "w") as file_:
+            self._write_pddl_problem(file_)
+
+    def render_pddl_domain(self):
+        file_ = StringIO()
+        self._write_pddl_domain(file_)
+        return file_.getvalue()
+
+    def render_pddl_problem(self):
+        file_ = StringIO()
+        self._write_pddl_problem(file_)
+        return file_.getvalue()
+
+    def _write_pddl_domain(self, file_):
+        write = file_.write
+        write("(define (domain " + self.domain + ")\n")
         # Requirements
-        to_write += "\t(:requirements"
+        write("\t(:requirements")
         for r in self.requirements:
-            to_write += " :" + r
-        to_write += ")\n"
+            write(" :" + r)
+        write(")\n")
         # Types
-        to_write += "(:types\n"
+        write("(:types\n")
         for type_ in self.types:
-            to_write += "\t"
-            for key in self.types[type_]:
-                to_write += key + " "
-            to_write += "- " + type_
-            to_write += "\n"
-        to_write += ")\n"
+            write("\t" + " ".join(self.types[type_]) + " - " + type_ + "\n")
+        write(")\n")
         # Constants
         if len(self.constants) > 0:
-            to_write += "(:constants\n"
+            write("(:constants\n")
             for t in self.constants.keys():
-                to_write += "\t"
-                for c in self.constants[t]:
-                    to_write += c + " "
-                to_write += " - " + t + "\n"
-            to_write += ")\n"
+                write("\t" + " ".join(self.constants[t]) + " - " + t + "\n")
+            write(")\n")
         # Public predicates
-        to_write += "(:predicates\n"
+        write("(:predicates\n")
         for predicate in self.predicates:
-            to_write += "\t{}\n".format(predicate.pddl_rep())
-        to_write += ")\n"
+            write("\t{}\n".format(predicate.pddl_rep()))
+        write(")\n")
         # Functions
         if len(self.functions) > 0:
-            to_write += "(:functions\n"
+            write("(:functions\n")
             for function in self.functions:
-                to_write += "\t{}\n".format(function.pddl_rep())
-            to_write += ")\n"
+                write("\t{}\n".format(function.pddl_rep()))
+            write(")\n")
         # Actions
         for action in self.actions:
-            to_write += "\n{}\n".format(action.pddl_rep())
+            write("\n{}\n".format(action.pddl_rep()))
 
-        to_write += ")"  # Close domain definition
-        file_.write(to_write)
-        file_.close()
+        write(")")  # Close domain definition
 
-    def write_pddl_problem(self, output_file):
-        file_ = open(output_file, "w")
-        to_write = "(define (problem " + self.problem + ") "
-        to_write += "(:domain " + self.domain + ")\n"
+    def _write_pddl_problem(self, file_):
+        write = file_.write
+        write("(define (problem " + self.problem + ") ")
+        write("(:domain " + self.domain + ")\n")
         # Objects
-        to_write += "(:objects\n"
+        write("(:objects\n")
         for obj in self.object_list:
-            to_write += "\t" + obj + " - " + self.get_type_of_object(obj) + "\n"
-        to_write += ")\n"
-        to_write += "(:init\n"
+            write("\t" + obj + " - " + self.get_type_of_object(obj) + "\n")
+        write(")\n")
+        write("(:init\n")
         for predicate in self.init:
-            to_write += "\t{}\n".format(predicate)
+            write("\t{}\n".format(predicate))
         for function in self.ground_functions:
-            to_write += "\t{}\n".format(function)
-        to_write += ")\n"
-        to_write += "(:goal\n\t(and\n"
+            write("\t{}\n".format(function))
+        write(")\n")
+        write("(:goal\n\t(and\n")
         for goal in self.goal:
-            to_write += "\t\t{}\n".format(goal)
-        to_write += "\t)\n)\n"
+            write("\t\t{}\n".format(goal))
+        write("\t)\n)\n")
         if self.metric:
-            to_write += "(:metric minimize (total-cost))\n"
-        to_write += ")"
-        file_.write(to_write)
-        file_.close()
+            write("(:metric minimize (total-cost))\n")
+        write(")")
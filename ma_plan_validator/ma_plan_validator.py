@@ -1,6 +1,10 @@
 import os
+import asyncio
+import threading
 import warnings
-import tempfile
+import weakref
+import itertools
+import multiprocessing
 import ma_plan_validator.convert_mapddl_to_pddl as mapddl_to_pddl
 import unified_planning as up
 from unified_planning.io.ma_pddl_writer import MAPDDLWriter
@@ -8,20 +12,553 @@ from unified_planning.io.pddl_reader import PDDLReader
 from unified_planning.plans.plan import ActionInstance
 from unified_planning.plans.sequential_plan import SequentialPlan
 from unified_planning.plans.partial_order_plan import PartialOrderPlan
-from unified_planning.model import ProblemKind, Action
+from unified_planning.model import ProblemKind, Action, InstantaneousAction
 from unified_planning.engines import Engine, MetaEngine
 from unified_planning.engines.mixins import PlanValidatorMixin
 from unified_planning.plans import PlanKind
 from unified_planning.engines.plan_validator import SequentialPlanValidator
+from unified_planning.engines.sequential_simulator import UPSequentialSimulator
 from unified_planning.engines.results import ValidationResult, ValidationResultStatus
 from unified_planning.engines.results import LogMessage, LogLevel
 from unified_planning.exceptions import UPUsageError
-from typing import Type
+from collections import OrderedDict, deque
+from functools import lru_cache
+from io import StringIO
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, FrozenSet, Iterator, List, Optional, Set, Tuple, Type
+
+
+def _fluent_key(fluent_exp: up.model.FNode):
+    """Identifies a fluent expression by its fluent and its ground arguments.
+
+    Arguments are None when they are not all constants (e.g. quantified
+    variables), in that case the key matches every grounding of the fluent.
+    """
+    args = fluent_exp.args
+    if all(arg.is_constant() for arg in args):
+        return (fluent_exp.fluent(), tuple(args))
+    return (fluent_exp.fluent(), None)
+
+
+def _collect_fluents(expression: up.model.FNode, keys: Set):
+    stack = [expression]
+    while stack:
+        node = stack.pop()
+        if node.is_fluent_exp():
+            keys.add(_fluent_key(node))
+        stack.extend(node.args)
+
+
+def _fluent_accesses(action_instance: ActionInstance) -> Optional[Tuple[Set, Set]]:
+    """Returns the fluents read and written by the given action instance.
+
+    Returns None when the action is not an InstantaneousAction.
+    """
+    action = action_instance.action
+    if not isinstance(action, InstantaneousAction):
+        return None
+    substituter = action.environment.substituter
+    substitutions = dict(zip(action.parameters, action_instance.actual_parameters))
+    read: Set = set()
+    written: Set = set()
+    for precondition in action.preconditions:
+        _collect_fluents(substituter.substitute(precondition, substitutions), read)
+    for effect in action.effects:
+        fluent = substituter.substitute(effect.fluent, substitutions)
+        written.add(_fluent_key(fluent))
+        if not effect.is_assignment():
+            # increase/decrease depend on the previous value
+            read.add(_fluent_key(fluent))
+        for arg in fluent.args:
+            _collect_fluents(arg, read)
+        _collect_fluents(substituter.substitute(effect.value, substitutions), read)
+        _collect_fluents(substituter.substitute(effect.condition, substitutions), read)
+    return read, written
+
+
+def _overlaps(keys: Set, other_keys: Set) -> bool:
+    for fluent, args in keys:
+        for other_fluent, other_args in other_keys:
+            if fluent == other_fluent and (
+                args is None or other_args is None or args == other_args
+            ):
+                return True
+    return False
+
+
+def _interferences(
+    pop_plan: PartialOrderPlan,
+) -> Optional[Dict[ActionInstance, Set[ActionInstance]]]:
+    """Maps each action instance to the unordered action instances it interferes with.
+
+    Two action instances interfere when one writes a fluent read or written by
+    the other. Returns None when the fluents accessed by an action instance
+    are not known.
+    """
+    adjacency_list = pop_plan.get_adjacency_list
+    accesses: Dict[ActionInstance, Tuple[Set, Set]] = {}
+    # Repeated ground steps share the analysis of their conditions and effects
+    ground_accesses: Dict[Tuple, Optional[Tuple[Set, Set]]] = {}
+    for action_instance in adjacency_list:
+        key = (action_instance.action.name, action_instance.actual_parameters)
+        if key not in ground_accesses:
+            ground_accesses[key] = _fluent_accesses(action_instance)
+        action_accesses = ground_accesses[key]
+        if action_accesses is None:
+            return None
+        accesses[action_instance] = action_accesses
+    reachable: Dict[ActionInstance, Set[ActionInstance]] = {}
+    for action_instance in adjacency_list:
+        seen: Set[ActionInstance] = set()
+        stack = list(adjacency_list[action_instance])
+        while stack:
+            successor = stack.pop()
+            if successor not in seen:
+                seen.add(successor)
+                stack.extend(adjacency_list[successor])
+        reachable[action_instance] = seen
+    interferences: Dict[ActionInstance, Set[ActionInstance]] = {
+        ai: set() for ai in adjacency_list
+    }
+    action_instances = list(adjacency_list)
+    for i, first in enumerate(action_instances):
+        read, written = accesses[first]
+        for second in action_instances[i + 1 :]:
+            if second in reachable[first] or first in reachable[second]:
+                continue
+            other_read, other_written = accesses[second]
+            if (
+                _overlaps(written, other_read)
+                or _overlaps(written, other_written)
+                or _overlaps(other_written, read)
+            ):
+                interferences[first].add(second)
+                interferences[second].add(first)
+    return interferences
+
+
+def _has_independent_linearizations(pop_plan: PartialOrderPlan) -> bool:
+    """Checks if all the linearizations of the plan are equivalent.
+
+    This holds when no action instance interferes with an action instance
+    that is not ordered with it, so every linearization can be turned into
+    any other by swapping independent actions. Validating one of them is
+    then enough to validate the partial order plan.
+    """
+    interferences = _interferences(pop_plan)
+    return interferences is not None and not any(interferences.values())
+
+
+def _threat_first_linearizations(
+    problem: up.model.Problem, pop_plan: PartialOrderPlan
+) -> Iterator[SequentialPlan]:
+    """Enumerates the linearizations of the plan, threatened orderings first.
+
+    Ready action instances that interfere with more unordered ones are
+    scheduled first, so that the linearizations most likely to break a
+    causal link come out early. Linearizations that only differ by swapping
+    independent actions reach the same states, a sleep set keeps one of them.
+    """
+    adjacency_list = pop_plan.get_adjacency_list
+    interferences = _interferences(pop_plan)
+    predecessors: Dict[ActionInstance, Set[ActionInstance]] = {
+        ai: set() for ai in adjacency_list
+    }
+    for action_instance, successors in adjacency_list.items():
+        for successor in successors:
+            predecessors[successor].add(action_instance)
+
+    def ready(done):
+        candidates = [
+            ai for ai in adjacency_list if ai not in done and predecessors[ai] <= done
+        ]
+        if interferences is not None:
+            candidates.sort(key=lambda ai: len(interferences[ai]), reverse=True)
+        return iter(candidates)
+
+    def independent(action_instance, other):
+        return interferences is not None and other not in interferences[action_instance]
+
+    if len(adjacency_list) == 0:
+        yield SequentialPlan([], problem.environment)
+        return
+    prefix: List[ActionInstance] = []
+    stack = [(frozenset(), set(), ready(frozenset()))]
+    while stack:
+        done, sleep, candidates = stack[-1]
+        action_instance = next(candidates, None)
+        if action_instance is None:
+            stack.pop()
+            if prefix:
+                prefix.pop()
+            continue
+        if action_instance in sleep:
+            continue
+        new_done = done | {action_instance}
+        # Linearizations starting with an action explored before from this
+        # prefix are equivalent to one already enumerated, unless the new
+        # action interferes with it
+        new_sleep = {ai for ai in sleep if independent(action_instance, ai)}
+        sleep.add(action_instance)
+        if len(new_done) == len(adjacency_list):
+            yield SequentialPlan(prefix + [action_instance], problem.environment)
+            continue
+        prefix.append(action_instance)
+        stack.append((new_done, new_sleep, ready(new_done)))
+
+
+def _parameter_domains(problem: up.model.Problem) -> Dict[str, List[Optional[Set]]]:
+    """Restricts the values of the action parameters through their static preconditions.
+
+    A precondition on a boolean fluent that no action modifies only holds on
+    the atoms true in the initial state, so a parameter it mentions can only
+    take the values found at its position in those atoms. Domains are keyed
+    by action name, None stands for an unrestricted parameter.
+    """
+    if not all(isinstance(action, InstantaneousAction) for action in problem.actions):
+        return {}
+    modified = {
+        effect.fluent.fluent() for action in problem.actions for effect in action.effects
+    }
+    true_atoms: Dict[up.model.Fluent, List] = {}
+    for fluent_exp, value in problem.explicit_initial_values.items():
+        if value.is_true():
+            true_atoms.setdefault(fluent_exp.fluent(), []).append(fluent_exp.args)
+    domains: Dict[str, List[Optional[Set]]] = {}
+    for action in problem.actions:
+        parameter_index = {p: i for i, p in enumerate(action.parameters)}
+        action_domains: List[Optional[Set]] = [None] * len(action.parameters)
+        stack = list(action.preconditions)
+        while stack:
+            condition = stack.pop()
+            if condition.is_and():
+                stack.extend(condition.args)
+                continue
+            if not condition.is_fluent_exp():
+                continue
+            fluent = condition.fluent()
+            default = problem.fluents_defaults.get(fluent)
+            if fluent in modified or default is None or not default.is_false():
+                continue
+            atoms = true_atoms.get(fluent, [])
+            for position, arg in enumerate(condition.args):
+                if arg.is_parameter_exp():
+                    index = parameter_index[arg.parameter()]
+                    values = {atom[position] for atom in atoms}
+                    domain = action_domains[index]
+                    action_domains[index] = values if domain is None else domain & values
+        domains[action.name] = action_domains
+    return domains
+
+
+def _outside_parameter_domains(
+    action_instances, domains: Dict[str, List[Optional[Set]]]
+) -> Optional[ActionInstance]:
+    """Returns an action instance that can never be applied, if any."""
+    for action_instance in action_instances:
+        action_domains = domains.get(action_instance.action.name)
+        if action_domains is None:
+            continue
+        for value, domain in zip(action_instance.actual_parameters, action_domains):
+            if domain is not None and value not in domain:
+                return action_instance
+    return None
+
+
+def _one_linearization(
+    problem: up.model.Problem, pop_plan: PartialOrderPlan
+) -> SequentialPlan:
+    """Returns a linearization of the plan, built with Kahn's algorithm.
+
+    Raises UPUsageError when the orderings of the plan contain a cycle.
+    """
+    adjacency_list = pop_plan.get_adjacency_list
+    in_degree: Dict[ActionInstance, int] = {ai: 0 for ai in adjacency_list}
+    for successors in adjacency_list.values():
+        for successor in successors:
+            in_degree[successor] += 1
+    ready = deque(ai for ai, degree in in_degree.items() if degree == 0)
+    order: List[ActionInstance] = []
+    while ready:
+        action_instance = ready.popleft()
+        order.append(action_instance)
+        for successor in adjacency_list[action_instance]:
+            in_degree[successor] -= 1
+            if in_degree[successor] == 0:
+                ready.append(successor)
+    if len(order) != len(adjacency_list):
+        raise UPUsageError("The partial order plan contains a cycle")
+    return SequentialPlan(order, problem.environment)
+
+
+def _find_invalid_linearization(
+    problem: up.model.Problem,
+    pop_plan: PartialOrderPlan,
+    simulator: UPSequentialSimulator,
+) -> Optional[SequentialPlan]:
+    """Searches a linearization of the plan that is not valid for the problem.
+
+    Linearizations are explored depth first with the given simulator of the
+    problem.
+    Prefixes that executed the same action instances and reached the same
+    state have the same continuations, so each of them is expanded once.
+    Returns None if every linearization is valid.
+    """
+    adjacency_list = pop_plan.get_adjacency_list
+    order = _one_linearization(problem, pop_plan).actions
+    predecessors: Dict[ActionInstance, Set[ActionInstance]] = {
+        ai: set() for ai in adjacency_list
+    }
+    for action_instance, successors in adjacency_list.items():
+        for successor in successors:
+            predecessors[successor].add(action_instance)
+
+    def ready(done):
+        return iter(
+            [ai for ai in order if ai not in done and predecessors[ai] <= done]
+        )
+
+    def linearization(prefix, done):
+        rest = [ai for ai in order if ai not in done]
+        return SequentialPlan(prefix + rest, problem.environment)
+
+    initial_state = simulator.get_initial_state()
+    if len(order) == 0:
+        return None if simulator.is_goal(initial_state) else SequentialPlan([])
+    prefix: List[ActionInstance] = []
+    explored = set()
+    stack = [(initial_state, frozenset(), ready(frozenset()))]
+    while stack:
+        state, done, candidates = stack[-1]
+        action_instance = next(candidates, None)
+        if action_instance is None:
+            stack.pop()
+            if prefix:
+                prefix.pop()
+            continue
+        new_state = simulator.apply(state, action_instance)
+        new_done = done | {action_instance}
+        if new_state is None:
+            return linearization(prefix + [action_instance], new_done)
+        if len(new_done) == len(order):
+            if not simulator.is_goal(new_state):
+                return linearization(prefix + [action_instance], new_done)
+            continue
+        key = (new_done, new_state)
+        if key in explored:
+            continue
+        explored.add(key)
+        prefix.append(action_instance)
+        stack.append((new_state, new_done, ready(new_done)))
+    return None
+
+
+# Below this number of linearizations left to validate, forking workers
+# costs more than validating them in-process
+_PARALLEL_LINEARIZATIONS = 16
+
+# Per-process state of the linearization validation workers
+_worker_problem: Optional[up.model.Problem] = None
+_worker_engine: Optional[Engine] = None
+
+
+def _init_linearization_worker(problem: up.model.Problem, engine: Engine):
+    """Sets up a forked worker, which inherits the problem and its own copy of
+    the configured engine instead of unpickling or rebuilding them."""
+    global _worker_problem, _worker_engine
+    _worker_problem = problem
+    _worker_engine = engine
+    _worker_engine.skip_checks = True
+
+
+def _validate_linearization(
+    actions: List[Tuple[str, List[str]]]
+) -> ValidationResultStatus:
+    """Validates a linearization given as (action name, object names) pairs."""
+    assert _worker_problem is not None and _worker_engine is not None
+    plan = SequentialPlan(
+        [
+            ActionInstance(
+                _worker_problem.action(name),
+                [_worker_problem.object(o) for o in params],
+            )
+            for name, params in actions
+        ],
+        _worker_problem.environment,
+    )
+    return _worker_engine.validate(_worker_problem, plan).status
+
+
+class ProblemCentralizer:
+    """Builds the centralized `up.model.Problem` of a MultiAgentProblem in memory.
+
+    Every agent becomes an object of its own type, agent fluents are copied for
+    each agent (`a_<fluent>_<agent>`) and every agent action becomes
+    `<action>_<agent>`, with the agent as first parameter. Actions and objects
+    are named as in the MA-PDDL conversion, which is all the PlanConverter
+    relies on; fluents are not, MA-PDDL keeps one `a_<fluent>` with the agent
+    as parameter.
+    """
+
+    def __init__(self, problem: up.model.multi_agent.MultiAgentProblem):
+        self.problem = problem
+        # Key = (agent name or None for the environment, fluent name)
+        self._fluents: Dict[Tuple[Optional[str], str], up.model.Fluent] = {}
+        self._agent_types: Dict[str, up.model.Type] = {}
+        self._names: Set[str] = set()
+
+    def centralize(self) -> Optional[up.model.Problem]:
+        """Returns the centralized problem, None if a feature is not supported."""
+        problem = self.problem
+        env = problem.environment
+        for agent in problem.agents:
+            if len(agent.public_goals) > 0 or len(agent.private_goals) > 0:
+                return None
+            for action in agent.actions:
+                if not isinstance(action, InstantaneousAction):
+                    return None
+        new_problem = up.model.Problem(problem.name, env)
+        new_problem.add_objects(problem.all_objects)
+        for fluent in problem.ma_environment.fluents:
+            default = problem.ma_environment.fluents_defaults.get(fluent)
+            self._add_fluent(new_problem, None, fluent, fluent.name, default)
+
+        type_manager = env.type_manager
+        agent_type = type_manager.UserType(self._fresh_name("ag"))
+        for agent in problem.agents:
+            self._agent_types[agent.name] = type_manager.UserType(
+                self._fresh_name(f"{agent.name}_type"), agent_type
+            )
+            new_problem.add_object(
+                up.model.Object(agent.name, self._agent_types[agent.name], env)
+            )
+            for fluent in agent.fluents:
+                default = agent.fluents_defaults.get(fluent)
+                name = self._fresh_name(f"a_{fluent.name}_{agent.name}")
+                self._add_fluent(new_problem, agent, fluent, name, default)
+
+        for agent in problem.agents:
+            for action in agent.actions:
+                new_action = self._centralize_action(agent, action)
+                if new_action is None or new_problem.has_name(new_action.name):
+                    return None
+                new_problem.add_action(new_action)
+
+        for fluent_exp, value in problem.explicit_initial_values.items():
+            new_fluent_exp = self._centralize_expression(fluent_exp, None)
+            if new_fluent_exp is None:
+                return None
+            new_problem.set_initial_value(new_fluent_exp, value)
+        for goal in problem.goals:
+            new_goal = self._centralize_expression(goal, None)
+            if new_goal is None:
+                return None
+            new_problem.add_goal(new_goal)
+        return new_problem
+
+    def _fresh_name(self, name: str) -> str:
+        while self.problem.has_name(name) or name in self._names:
+            name = f"{name}_"
+        self._names.add(name)
+        return name
+
+    def _add_fluent(self, new_problem, agent, fluent, name, default):
+        if default is None and fluent.type.is_bool_type():
+            # Closed world assumption, as in the MA-PDDL conversion
+            default = False
+        new_fluent = up.model.Fluent(
+            name, fluent.type, fluent.signature, fluent.environment
+        )
+        new_problem.add_fluent(new_fluent, default_initial_value=default)
+        self._fluents[(agent.name if agent is not None else None, fluent.name)] = (
+            new_fluent
+        )
+
+    def _centralize_action(self, agent, action):
+        parameters = OrderedDict([(agent.name, self._agent_types[agent.name])])
+        for parameter in action.parameters:
+            if parameter.name in parameters:
+                return None
+            parameters[parameter.name] = parameter.type
+        new_action = InstantaneousAction(
+            f"{action.name}_{agent.name}", parameters, action.environment
+        )
+        for precondition in action.preconditions:
+            new_precondition = self._centralize_expression(precondition, agent)
+            if new_precondition is None:
+                return None
+            new_action.add_precondition(new_precondition)
+        for effect in action.effects:
+            fluent = self._centralize_expression(effect.fluent, agent)
+            value = self._centralize_expression(effect.value, agent)
+            condition = self._centralize_expression(effect.condition, agent)
+            if fluent is None or value is None or condition is None:
+                return None
+            if effect.is_increase():
+                new_action.add_increase_effect(fluent, value, condition, effect.forall)
+            elif effect.is_decrease():
+                new_action.add_decrease_effect(fluent, value, condition, effect.forall)
+            else:
+                new_action.add_effect(fluent, value, condition, effect.forall)
+        return new_action
+
+    def _centralize_expression(self, expression, agent):
+        """Replaces the MA fluent expressions with the centralized ones.
+
+        Bare fluent expressions are resolved in the scope of the given agent,
+        Dot expressions in the scope of their own agent.
+        Returns None if a fluent can't be resolved.
+        """
+        substitutions: Dict[up.model.FNode, up.model.FNode] = {}
+        stack = [expression]
+        while stack:
+            node = stack.pop()
+            if node.is_dot() or node.is_fluent_exp():
+                new_node = self._centralize_fluent_exp(node, agent)
+                if new_node is None:
+                    return None
+                substitutions[node] = new_node
+            else:
+                stack.extend(node.args)
+        substituter = self.problem.environment.substituter
+        return substituter.substitute(expression, substitutions)
+
+    def _centralize_fluent_exp(self, fluent_exp, agent):
+        if fluent_exp.is_dot():
+            agent = self.problem.agent(fluent_exp.agent())
+            fluent_exp = fluent_exp.arg(0)
+        fluent = fluent_exp.fluent()
+        new_fluent = None
+        if agent is not None:
+            new_fluent = self._fluents.get((agent.name, fluent.name))
+        if new_fluent is None:
+            new_fluent = self._fluents.get((None, fluent.name))
+        if new_fluent is None:
+            return None
+        new_args = []
+        for arg in fluent_exp.args:
+            new_arg = self._centralize_expression(arg, agent)
+            if new_arg is None:
+                return None
+            new_args.append(new_arg)
+        return new_fluent(*new_args)
 
 
 class PlanConverter:
     def __init__(self, problem: up.model.AbstractProblem):
+        assert isinstance(
+            problem, up.model.Problem
+        ), "problem is not an instance of up.model.Problem"
         self.problem = problem
+        self._actions: Dict[str, Action] = {a.name: a for a in problem.actions}
+        self._objects: Dict[str, up.model.Object] = {
+            o.name: o for o in problem.all_objects
+        }
+        self._agent_params: Dict[str, up.model.Object] = {}
+        # Key = original action instance, by identity, Value = converted one
+        self._converted: "weakref.WeakKeyDictionary[ActionInstance, ActionInstance]" = (
+            weakref.WeakKeyDictionary()
+        )
 
     def convert_sequential_plan(self, sequential_plan: SequentialPlan):
         new_plan = []
@@ -31,31 +568,40 @@ class PlanConverter:
         return SequentialPlan(actions=new_plan, environment=self.problem.environment)
 
     def _convert_action(self, action_instance: ActionInstance):
+        new_act_instance = self._converted.get(action_instance)
+        if new_act_instance is None:
+            new_act_instance = self._build_action(action_instance)
+            self._converted[action_instance] = new_act_instance
+        return new_act_instance
+
+    def _build_action(self, action_instance: ActionInstance):
         assert isinstance(action_instance, ActionInstance)
         if action_instance.agent is None:
             raise ValueError("Action instance does not have an associated agent.")
         action_name = f"{action_instance.action.name}_{action_instance.agent.name}"
-        assert isinstance(
-            self.problem, up.model.Problem
-        ), "problem is not an instance of up.model.Problem"
-        for act_prob in self.problem.actions:
-            if action_name == act_prob.name:
-                agent_param = self._get_agent_param(act_prob)
-                new_params = [agent_param]
-                for ap in action_instance.actual_parameters:
-                    new_obj = self.problem.object(ap.object().name)
-                    new_params.append(new_obj)
-                return ActionInstance(action=act_prob, params=new_params)
-        raise ValueError(f"No matching action found for {action_name}")
+        act_prob = self._actions.get(action_name)
+        if act_prob is None:
+            raise ValueError(f"No matching action found for {action_name}")
+        new_params = [self._get_agent_param(act_prob)]
+        for ap in action_instance.actual_parameters:
+            new_params.append(self._get_object(ap.object().name))
+        return ActionInstance(action=act_prob, params=new_params)
+
+    def _get_object(self, name: str) -> up.model.Object:
+        obj = self._objects.get(name)
+        if obj is None:
+            # Let the problem raise its own error for unknown objects
+            obj = self.problem.object(name)
+        return obj
 
     def _get_agent_param(self, act_prob: Action):
-        assert isinstance(
-            self.problem, up.model.Problem
-        ), "problem is not an instance of up.model.Problem"
-        agent_param = self.problem.object(act_prob.parameters[0].name)
-        assert (
-            agent_param.type == act_prob.parameters[0].type
-        ), f"Type mismatch for agent parameter in action {act_prob.name}"
+        agent_param = self._agent_params.get(act_prob.name)
+        if agent_param is None:
+            agent_param = self._get_object(act_prob.parameters[0].name)
+            assert (
+                agent_param.type == act_prob.parameters[0].type
+            ), f"Type mismatch for agent parameter in action {act_prob.name}"
+            self._agent_params[act_prob.name] = agent_param
         return agent_param
 
     def convert_pop_plan(self, pop_plan: PartialOrderPlan):
@@ -63,10 +609,62 @@ class PlanConverter:
         return new_pop
 
 
+@lru_cache(maxsize=None)
+def _engine_supported_kind(engine: Type[Engine]) -> ProblemKind:
+    """The kind supported by MAPlanValidator wrapping the given engine class."""
+    supported_kind = ProblemKind(version=2)
+    supported_kind.set_problem_class("ACTION_BASED_MULTI_AGENT")
+    supported_kind.set_typing("FLAT_TYPING")
+    supported_kind.set_typing("HIERARCHICAL_TYPING")
+    supported_kind.set_conditions_kind("NEGATIVE_CONDITIONS")
+    supported_kind.set_conditions_kind("EQUALITIES")
+    supported_kind.set_conditions_kind("DISJUNCTIVE_CONDITIONS")
+    supported_kind.set_conditions_kind("EXISTENTIAL_CONDITIONS")
+    supported_kind.set_effects_kind("CONDITIONAL_EFFECTS")
+    final_supported_kind = supported_kind.intersection(engine.supported_kind())
+    additive_supported_kind = ProblemKind(version=2)
+    additive_supported_kind.set_problem_class("ACTION_BASED_MULTI_AGENT")
+    return final_supported_kind.union(additive_supported_kind)
+
+
+@lru_cache(maxsize=None)
+def _engine_supports_features(
+    features: FrozenSet[str], version: int, engine: Type[Engine]
+) -> bool:
+    return ProblemKind(features, version) <= _engine_supported_kind(engine)
+
+
+def _engine_supports(problem_kind: ProblemKind, engine: Type[Engine]) -> bool:
+    # Keyed on a snapshot: the caller may mutate problem_kind afterwards
+    return _engine_supports_features(
+        frozenset(problem_kind.features), problem_kind.version, engine
+    )
+
+
 class MAPlanValidator(MetaEngine, PlanValidatorMixin):
     def __init__(self, *args, **kwargs):
         MetaEngine.__init__(self, *args, **kwargs)
         PlanValidatorMixin.__init__(self)
+        # Validations share the caches and toggle self.engine.skip_checks
+        self._validate_lock = threading.Lock()
+        # Key = id of the MA problem, Value = (weakref to it, copy of it when
+        # cached, centralized problem, converter, parameter domains, simulator)
+        self._centralized_cache: Dict[
+            int,
+            Tuple[
+                weakref.ref,
+                "up.model.multi_agent.MultiAgentProblem",
+                "up.model.Problem",
+                "PlanConverter",
+                Dict,
+                Optional[UPSequentialSimulator],
+            ],
+        ] = {}
+        # Forked workers validating linearizations, created on demand for the
+        # centralized problem they inherit
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_problem: Optional["up.model.Problem"] = None
+        self._pool_workers = 0
 
     def name(self):
         return "MAPlanValidator"
@@ -89,26 +687,195 @@ class MAPlanValidator(MetaEngine, PlanValidatorMixin):
 
     @staticmethod
     def _supported_kind(engine: Type[Engine]) -> "ProblemKind":
-        supported_kind = ProblemKind(version=2)
-        supported_kind.set_problem_class("ACTION_BASED_MULTI_AGENT")
-        supported_kind.set_typing("FLAT_TYPING")
-        supported_kind.set_typing("HIERARCHICAL_TYPING")
-        supported_kind.set_conditions_kind("NEGATIVE_CONDITIONS")
-        supported_kind.set_conditions_kind("EQUALITIES")
-        supported_kind.set_conditions_kind("DISJUNCTIVE_CONDITIONS")
-        supported_kind.set_conditions_kind("EXISTENTIAL_CONDITIONS")
-        supported_kind.set_effects_kind("CONDITIONAL_EFFECTS")
-        final_supported_kind = supported_kind.intersection(engine.supported_kind())
-        additive_supported_kind = ProblemKind(version=2)
-        additive_supported_kind.set_problem_class("ACTION_BASED_MULTI_AGENT")
-        return final_supported_kind.union(additive_supported_kind)
+        # A copy, so callers can't alter the cached kind behind supports()
+        return _engine_supported_kind(engine).clone()
 
     @staticmethod
     def _supports(problem_kind: "ProblemKind", engine: Type[Engine]) -> bool:
-        return problem_kind <= MAPlanValidator._supported_kind(engine)
+        return _engine_supports(problem_kind, engine)
+
+    def _centralize_with_ma_pddl(
+        self, problem: "up.model.multi_agent.MultiAgentProblem"
+    ) -> "up.model.Problem":
+        """Centralizes the problem through its unfactored MA-PDDL representation."""
+        # Writing the MultiAgent problem, the unfactored domain and problem
+        # are the same for every agent and the writer keeps the last ones
+        ma_pddl_writer = MAPDDLWriter(problem, unfactored=True)
+        domain = list(ma_pddl_writer.get_ma_domains().values())[-1]
+        ma_problem = list(ma_pddl_writer.get_ma_problems().values())[-1]
+
+        # Convert the problem to a PDDL problem
+        planning_problem = mapddl_to_pddl.PlanningProblem(
+            StringIO(domain), StringIO(ma_problem)
+        )
+
+        # Parse the problem using the PDDL reader
+        pddl_reader = PDDLReader()
+        pddl_problem = pddl_reader.parse_problem_string(
+            planning_problem.render_pddl_domain(), planning_problem.render_pddl_problem()
+        )
+        return pddl_problem
+
+    def _centralize(self, problem: "up.model.multi_agent.MultiAgentProblem") -> Tuple[
+        "up.model.Problem", "PlanConverter", Dict, Optional[UPSequentialSimulator]
+    ]:
+        """Returns the centralized problem, its PlanConverter, its parameter
+        domains and, when the linearizations are searched with it, its
+        simulator, computed once per problem.
+
+        Problems are mutable, so a cached entry is only reused while the
+        problem is still equal to the copy taken when it was computed."""
+        key = id(problem)
+        cached = self._centralized_cache.get(key)
+        if cached is not None and cached[0]() is problem and cached[1] == problem:
+            return cached[2], cached[3], cached[4], cached[5]
+
+        pddl_problem = ProblemCentralizer(problem).centralize()
+        if pddl_problem is None:
+            pddl_problem = self._centralize_with_ma_pddl(problem)
+        plan_converter = PlanConverter(pddl_problem)
+        parameter_domains = _parameter_domains(pddl_problem)
+        # The simulator stands in for the engine on the linearizations it
+        # searches, so it is only used when the engine has the same semantics
+        simulator = None
+        if type(self.engine) is SequentialPlanValidator and UPSequentialSimulator.supports(
+            pddl_problem.kind
+        ):
+            simulator = UPSequentialSimulator(pddl_problem, error_on_failed_checks=False)
+
+        cache = self._centralized_cache
+        problem_ref = weakref.ref(problem, lambda _: cache.pop(key, None))
+        cache[key] = (
+            problem_ref,
+            problem.clone(),
+            pddl_problem,
+            plan_converter,
+            parameter_domains,
+            simulator,
+        )
+        return pddl_problem, plan_converter, parameter_domains, simulator
+
+    def _linearization_pool(
+        self, pddl_problem: "up.model.Problem"
+    ) -> Optional[ProcessPoolExecutor]:
+        """Returns the pool of workers forked with the given problem, None when
+        the linearizations have to be validated in-process.
+
+        Forking copies only the calling thread, a lock held by another one
+        stays locked forever in the workers, so no pool is started while
+        other threads run (e.g. from validate_async).
+        """
+        if self._pool is not None and self._pool_problem is pddl_problem:
+            return self._pool
+        self.destroy()
+        max_workers = min(os.cpu_count() or 1, _PARALLEL_LINEARIZATIONS)
+        if (
+            max_workers == 1
+            or "fork" not in multiprocessing.get_all_start_methods()
+            or threading.active_count() > 1
+        ):
+            return None
+        self._pool = ProcessPoolExecutor(
+            max_workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_linearization_worker,
+            initargs=(pddl_problem, self.engine),
+        )
+        self._pool_problem = pddl_problem
+        self._pool_workers = max_workers
+        return self._pool
+
+    def destroy(self):
+        """Shuts down the workers validating linearizations, if any."""
+        pool = getattr(self, "_pool", None)
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+            self._pool = None
+            self._pool_problem = None
+            self._pool_workers = 0
+
+    def __del__(self):
+        self.destroy()
+
+    def _validate_linearizations(
+        self, pddl_problem: "up.model.Problem", new_plans
+    ) -> ValidationResultStatus:
+        """Validates every linearization, stopping at the first invalid one.
+
+        The first linearization is validated by the engine, so that it checks
+        the problem once; when many others follow they are spread over forked
+        worker processes, which are kept for the next validations of the
+        same problem.
+        """
+        new_plans = iter(new_plans)
+        status = self.engine.validate(pddl_problem, next(new_plans)).status
+        if status != ValidationResultStatus.VALID:
+            return status
+        first_plans = list(itertools.islice(new_plans, _PARALLEL_LINEARIZATIONS))
+        pool = None
+        if len(first_plans) == _PARALLEL_LINEARIZATIONS:
+            pool = self._linearization_pool(pddl_problem)
+        new_plans = itertools.chain(first_plans, new_plans)
+
+        if pool is None:
+            skip_checks = self.engine.skip_checks
+            self.engine.skip_checks = True
+            try:
+                for new_plan in new_plans:
+                    status = self.engine.validate(pddl_problem, new_plan).status
+                    if status != ValidationResultStatus.VALID:
+                        return status
+            finally:
+                self.engine.skip_checks = skip_checks
+            return ValidationResultStatus.VALID
+
+        pending: Set = set()
+        try:
+            for new_plan in itertools.chain(new_plans, [None]):
+                if new_plan is not None:
+                    actions = [
+                        (ai.action.name, [p.object().name for p in ai.actual_parameters])
+                        for ai in new_plan.actions
+                    ]
+                    pending.add(pool.submit(_validate_linearization, actions))
+                # Keeps a bounded number of linearizations in flight, draining
+                # the pending ones once the enumeration is over
+                while pending and (
+                    new_plan is None or len(pending) >= 2 * self._pool_workers
+                ):
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future.result() != ValidationResultStatus.VALID:
+                            return future.result()
+        except BaseException:
+            # The workers may be broken or still busy, start afresh next time
+            self.destroy()
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+        return ValidationResultStatus.VALID
+
+    async def validate_async(
+        self, problem: "up.model.AbstractProblem", plan: "up.plans.Plan"
+    ) -> "ValidationResult":
+        """Validates the plan in a worker thread, so that the event loop is free
+        while the engine runs (e.g. an external validator binary).
+
+        Concurrent validations on the same instance run one at a time, use one
+        instance per task to validate in parallel. Worker threads don't fork
+        processes, their linearizations are validated in-process."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.validate, problem, plan)
 
     def _validate(
         self, problem: "up.model.AbstractProblem", plan: "up.plans.Plan"
+    ) -> "ValidationResult":
+        with self._validate_lock:
+            return self._validate_plan(problem, plan)
+
+    def _validate_plan(
+        self, problem: "up.model.AbstractProblem", plan: "up.plans.Plan"
     ) -> "ValidationResult":
         assert isinstance(problem, up.model.multi_agent.MultiAgentProblem)
         assert isinstance(plan, PartialOrderPlan)
@@ -122,49 +889,59 @@ class MAPlanValidator(MetaEngine, PlanValidatorMixin):
             else:
                 warnings.warn(msg)
 
-        with tempfile.TemporaryDirectory() as tempdir:
-            # Writing the MultiAgent problem
-            ma_pddl_writer = MAPDDLWriter(problem, unfactored=True)
-            origin_dir = os.path.join(tempdir, "origin")
-            ma_pddl_writer.write_ma_domain(origin_dir)
-            ma_pddl_writer.write_ma_problem(origin_dir)
-            domain_path = os.path.join(origin_dir, "domain.pddl")
-            problem_path = os.path.join(origin_dir, "problem.pddl")
-
-            # Centralizing PDDL files
-            centralized_dir = os.path.join(tempdir, "centralized")
-            os.makedirs(centralized_dir)
-            new_domain_path = os.path.join(centralized_dir, "domain.pddl")
-            new_problem_path = os.path.join(centralized_dir, "problem.pddl")
-
-            # Convert the problem to a PDDL problem and write it out
-            planning_problem = mapddl_to_pddl.PlanningProblem(domain_path, problem_path)
-            planning_problem.write_pddl_domain(new_domain_path)
-            planning_problem.write_pddl_problem(new_problem_path)
-
-            # Parse the problem using the PDDL reader
-            pddl_reader = PDDLReader()
-            pddl_problem = pddl_reader.parse_problem(new_domain_path, new_problem_path)
-            plan_converter = PlanConverter(pddl_problem)
+        pddl_problem, plan_converter, parameter_domains, simulator = self._centralize(
+            problem
+        )
 
-        # Validate the plan
         logs = []
+        if plan.kind == PlanKind.PARTIAL_ORDER_PLAN:
+            new_plan = plan_converter.convert_pop_plan(plan)
+            action_instances = new_plan.get_adjacency_list
+        else:
+            new_plan = plan_converter.convert_sequential_plan(plan)
+            action_instances = new_plan.actions
+
+        # Every linearization contains the action instances whose static
+        # preconditions never hold, no need to simulate any of them
+        inapplicable = _outside_parameter_domains(action_instances, parameter_domains)
+        if inapplicable is not None:
+            logs.append(
+                LogMessage(LogLevel.INFO, f"{inapplicable} is never applicable")
+            )
+            return ValidationResult(ValidationResultStatus.INVALID, self.name(), logs)
+
+        # Validate the plan
         if self.engine.supports_plan(PlanKind.PARTIAL_ORDER_PLAN):
-            if plan.kind == PlanKind.PARTIAL_ORDER_PLAN:
-                new_plan = plan_converter.convert_pop_plan(plan)
-            else:
-                new_plan = plan_converter.convert_pop_plan(plan.convert_to(PlanKind.PARTIAL_ORDER_PLAN))
+            if new_plan.kind != PlanKind.PARTIAL_ORDER_PLAN:
+                new_plan = new_plan.convert_to(
+                    PlanKind.PARTIAL_ORDER_PLAN, pddl_problem
+                )
             validation_result = self.engine.validate(pddl_problem, new_plan)
         else:
-            if plan.kind == PlanKind.PARTIAL_ORDER_PLAN:
-                for seq_plan in plan.all_sequential_plans():
-                    new_plan = plan_converter.convert_sequential_plan(seq_plan)
+            if new_plan.kind == PlanKind.PARTIAL_ORDER_PLAN:
+                new_pop = new_plan
+                # Also rejects the plans whose orderings contain a cycle
+                linearization = _one_linearization(pddl_problem, new_pop)
+                if _has_independent_linearizations(new_pop):
+                    new_plan = linearization
+                    validation_result = self.engine.validate(pddl_problem, new_plan)
+                elif simulator is not None:
+                    # The engine validates the invalid linearization found, if any,
+                    # otherwise a representative one
+                    new_plan = _find_invalid_linearization(
+                        pddl_problem, new_pop, simulator
+                    )
+                    if new_plan is None:
+                        new_plan = linearization
                     validation_result = self.engine.validate(pddl_problem, new_plan)
-                    if validation_result.status != ValidationResultStatus.VALID:
-                        is_valid_plan = False
-                        break
+                else:
+                    new_plans = _threat_first_linearizations(pddl_problem, new_pop)
+                    validation_result = ValidationResult(
+                        self._validate_linearizations(pddl_problem, new_plans),
+                        self.name(),
+                        [],
+                    )
             else:
-                new_plan = plan_converter.convert_sequential_plan(plan)
                 validation_result = self.engine.validate(pddl_problem, new_plan)
 
         if validation_result.status != ValidationResultStatus.VALID:
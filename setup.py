@@ -1,8 +1,16 @@
 #!/usr/bin/env python3
 
+import os
+import warnings
 from setuptools import setup  # type: ignore
+from setuptools.command.build_ext import build_ext  # type: ignore
 import ma_plan_validator
 
+try:
+    from Cython.Build import cythonize  # type: ignore
+except ImportError:
+    cythonize = None
+
 
 long_description = """
  ============================================================
@@ -12,6 +20,34 @@ long_description = """
     ma_plan_validator is a validator for multi-agent problems.
 """
 
+# The MA-PDDL parser is compiled with Cython when available, otherwise the
+# pure Python module is used. Set MA_PLAN_VALIDATOR_NO_CYTHON to skip it.
+# Failing to compile it only warns, the package works without the extension.
+ext_modules = []
+if cythonize is not None and "MA_PLAN_VALIDATOR_NO_CYTHON" not in os.environ:
+    try:
+        ext_modules = cythonize(
+            "ma_plan_validator/convert_mapddl_to_pddl.py",
+            compiler_directives={"language_level": 3},
+        )
+    except Exception as ex:
+        warnings.warn(f"Cython failed, installing the pure Python parser: {ex}")
+
+
+class OptionalBuildExt(build_ext):
+    def run(self):
+        try:
+            build_ext.run(self)
+        except Exception as ex:
+            warnings.warn(f"Skipping the compiled parser: {ex}")
+
+    def build_extension(self, ext):
+        try:
+            build_ext.build_extension(self, ext)
+        except Exception as ex:
+            warnings.warn(f"Skipping the compiled parser: {ex}")
+
+
 setup(
     name="ma_plan_validator",
     version=ma_plan_validator.__version__,
@@ -20,6 +56,8 @@ setup(
     author_email="ale.trapasso8@gmail.com",
     url="",
     packages=["ma_plan_validator"],
+    ext_modules=ext_modules,
+    cmdclass={"build_ext": OptionalBuildExt},
     install_requires=[""],
     python_requires="",
     license="APACHE",
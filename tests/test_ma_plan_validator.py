@@ -0,0 +1,399 @@
+import asyncio
+import random
+import unittest
+from unittest import mock
+
+import unified_planning as up
+from unified_planning.model import ProblemKind
+from unified_planning.model.multi_agent import Agent, MultiAgentProblem
+from unified_planning.shortcuts import (
+    BoolType,
+    Dot,
+    Exists,
+    Fluent,
+    InstantaneousAction,
+    IntType,
+    Not,
+    Object,
+    UserType,
+    Variable,
+)
+from unified_planning.engines.plan_validator import SequentialPlanValidator
+from unified_planning.engines.results import ValidationResultStatus
+from unified_planning.exceptions import UPUsageError
+from unified_planning.plans import ActionInstance, PartialOrderPlan
+from unified_planning.test.examples.multi_agent import get_example_problems
+
+import ma_plan_validator.ma_plan_validator as ma_plan_validator
+from ma_plan_validator.ma_plan_validator import (
+    MAPlanValidator,
+    ProblemCentralizer,
+    _find_invalid_linearization,
+    _fluent_accesses,
+    _has_independent_linearizations,
+    _parameter_domains,
+    _threat_first_linearizations,
+)
+
+from tests.test_problem_centralizer import _meeting_problem, _random_pops
+
+
+def _chain(sequential_plan):
+    actions = list(sequential_plan.actions)
+    adjacency_list = {ai: [] for ai in actions}
+    for ai, successor in zip(actions, actions[1:]):
+        adjacency_list[ai].append(successor)
+    return PartialOrderPlan(adjacency_list)
+
+
+def _working_agents(count, invalid=False):
+    """Unordered agents raising a shared flag, every ordering of them is a
+    distinct linearization. When invalid, the first one needs the flag down."""
+    problem = MultiAgentProblem("working_agents")
+    flag = Fluent("flag", BoolType())
+    problem.ma_environment.add_fluent(flag, default_initial_value=False)
+    action_instances = []
+    for i in range(count):
+        agent = Agent(f"a{i}", problem)
+        done = Fluent("done", BoolType())
+        agent.add_public_fluent(done, default_initial_value=False)
+        work = InstantaneousAction("work")
+        if invalid and i == 0:
+            work.add_precondition(Not(flag))
+        work.add_effect(flag, True)
+        work.add_effect(done, True)
+        agent.add_action(work)
+        problem.add_agent(agent)
+        problem.add_goal(Dot(agent, done))
+        action_instances.append(ActionInstance(work, agent=agent))
+    return problem, PartialOrderPlan({ai: [] for ai in action_instances})
+
+
+def _relaxed_pops(sequential_plan, count, seed=0):
+    """Partial order plans keeping random orderings of the plan, which stays
+    one of their linearizations."""
+    rng = random.Random(seed)
+    actions = list(sequential_plan.actions)
+    pops = []
+    for _ in range(count):
+        adjacency_list = {ai: [] for ai in actions}
+        for i, ai in enumerate(actions):
+            for successor in actions[i + 1 :]:
+                if rng.random() < 0.9:
+                    adjacency_list[ai].append(successor)
+        pops.append(PartialOrderPlan(adjacency_list))
+    return pops
+
+
+def _switching_agents():
+    """Agents switching a shared light off and on before one that needs it on.
+    The switches done in either order reach different states."""
+    problem = MultiAgentProblem("switching_agents")
+    light = Fluent("light", BoolType())
+    problem.ma_environment.add_fluent(light, default_initial_value=False)
+    action_instances = []
+    for name, value in (("switch_off", False), ("switch_on", True), ("reader", None)):
+        agent = Agent(name, problem)
+        done = Fluent("done", BoolType())
+        agent.add_public_fluent(done, default_initial_value=False)
+        act = InstantaneousAction("act")
+        if value is None:
+            act.add_precondition(light)
+        else:
+            act.add_effect(light, value)
+        act.add_effect(done, True)
+        agent.add_action(act)
+        problem.add_agent(agent)
+        problem.add_goal(Dot(agent, done))
+        action_instances.append(ActionInstance(act, agent=agent))
+    off, on, read = action_instances
+    # Linearizations are searched from the valid order off, on, read first
+    pops = [
+        PartialOrderPlan({off: [read], on: [read], read: []}),
+        PartialOrderPlan({off: [on], on: [read], read: []}),
+        PartialOrderPlan({off: [], on: [read], read: []}),
+    ]
+    return problem, pops
+
+
+class _Validator(SequentialPlanValidator):
+    """Not UP's validator itself, so MAPlanValidator can't use the simulator."""
+
+
+class TestMAPlanValidator(unittest.TestCase):
+    def setUp(self):
+        up.shortcuts.get_environment().credits_stream = None
+        self.examples = get_example_problems()
+
+    def test_revalidate_after_problem_change(self):
+        test_case = self.examples["ma-loader"]
+        problem = test_case.problem.clone()
+        plan = _chain(test_case.valid_plans[0])
+        validator = MAPlanValidator[SequentialPlanValidator]()
+        self.assertEqual(
+            validator.validate(problem, plan).status, ValidationResultStatus.VALID
+        )
+
+        cargo_at = problem.ma_environment.fluent("cargo_at")
+        problem.add_goal(Not(cargo_at(problem.object("l3"))))
+        self.assertEqual(
+            validator.validate(problem, plan).status, ValidationResultStatus.INVALID
+        )
+
+    def test_cyclic_plan_is_rejected(self):
+        test_case = self.examples["ma-loader"]
+        plan = _chain(test_case.valid_plans[0])
+        adjacency_list = dict(plan.get_adjacency_list)
+        first, second = test_case.valid_plans[0].actions[:2]
+        cycle = [
+            ActionInstance(ai.action, ai.actual_parameters, ai.agent)
+            for ai in (first, second)
+        ]
+        last = test_case.valid_plans[0].actions[-1]
+        adjacency_list[last] = [cycle[0]]
+        adjacency_list[cycle[0]] = [cycle[1]]
+        adjacency_list[cycle[1]] = [cycle[0]]
+        validator = MAPlanValidator[SequentialPlanValidator]()
+        with self.assertRaises(UPUsageError):
+            validator.validate(test_case.problem, PartialOrderPlan(adjacency_list))
+
+    @mock.patch("os.cpu_count", return_value=2)
+    def test_linearizations_in_worker_processes(self, _):
+        validator = MAPlanValidator[_Validator]()
+        self.addCleanup(validator.destroy)
+        # 4! linearizations, enough to fork the workers
+        valid_problem, valid_plan = _working_agents(4)
+        invalid_problem, invalid_plan = _working_agents(4, invalid=True)
+        self.assertEqual(
+            validator.validate(valid_problem, valid_plan).status,
+            ValidationResultStatus.VALID,
+        )
+        pool = validator._pool
+        self.assertIsNotNone(pool)
+        self.assertEqual(
+            validator.validate(valid_problem, valid_plan).status,
+            ValidationResultStatus.VALID,
+        )
+        self.assertIs(validator._pool, pool)
+        self.assertEqual(
+            validator.validate(invalid_problem, invalid_plan).status,
+            ValidationResultStatus.INVALID,
+        )
+        self.assertIsNot(validator._pool, pool)
+        validator.destroy()
+        self.assertIsNone(validator._pool)
+
+    @mock.patch("os.cpu_count", return_value=2)
+    def test_few_linearizations_in_process(self, _):
+        validator = MAPlanValidator[_Validator]()
+        self.addCleanup(validator.destroy)
+        # 3! linearizations
+        for invalid, status in ((False, "VALID"), (True, "INVALID")):
+            problem, plan = _working_agents(3, invalid)
+            self.assertEqual(
+                validator.validate(problem, plan).status,
+                ValidationResultStatus[status],
+            )
+        self.assertIsNone(validator._pool)
+
+    @mock.patch("os.cpu_count", return_value=2)
+    def test_validate_async(self, _):
+        validator = MAPlanValidator[_Validator]()
+        self.addCleanup(validator.destroy)
+        valid_problem, valid_plan = _working_agents(4)
+        invalid_problem, invalid_plan = _working_agents(4, invalid=True)
+
+        async def validate_both():
+            return await asyncio.gather(
+                validator.validate_async(valid_problem, valid_plan),
+                validator.validate_async(invalid_problem, invalid_plan),
+            )
+
+        results = asyncio.run(validate_both())
+        self.assertEqual(
+            [result.status for result in results],
+            [ValidationResultStatus.VALID, ValidationResultStatus.INVALID],
+        )
+        # Worker threads validate the linearizations in-process
+        self.assertIsNone(validator._pool)
+
+    def assert_invalid_move(self, problem, never_applicable):
+        r1 = problem.agent("r1")
+        l1, l3 = problem.object("l1"), problem.object("l3")
+        move = ActionInstance(r1.action("move"), (l3, l1), agent=r1)
+        validator = MAPlanValidator[SequentialPlanValidator]()
+        result = validator.validate(problem, PartialOrderPlan({move: []}))
+        self.assertEqual(result.status, ValidationResultStatus.INVALID)
+        self.assertEqual(
+            any("is never applicable" in log.message for log in result.log_messages),
+            never_applicable,
+        )
+
+    def test_static_precondition_never_true(self):
+        problem, _ = _meeting_problem()
+        domains = _parameter_domains(ProblemCentralizer(problem).centralize())
+        # The agent comes first, its parameter is not restricted
+        agent_domain, from_domain, to_domain = domains["move_r1"]
+        self.assertIsNone(agent_domain)
+        self.assertEqual({value.object().name for value in from_domain}, {"l1", "l2"})
+        self.assertEqual({value.object().name for value in to_domain}, {"l2", "l3"})
+        self.assertEqual(domains["meet_r1"], [None, None])
+        self.assert_invalid_move(problem, never_applicable=True)
+
+    def test_static_fluent_true_by_default_is_not_pruned(self):
+        problem, _ = _meeting_problem(connected_default=True)
+        connected = problem.ma_environment.fluent("connected")
+        l1, l3 = problem.object("l1"), problem.object("l3")
+        problem.set_initial_value(connected(l3, l1), False)
+        domains = _parameter_domains(ProblemCentralizer(problem).centralize())
+        self.assertEqual(domains["move_r1"], [None, None, None])
+        self.assert_invalid_move(problem, never_applicable=False)
+
+    def test_modified_fluent_is_not_pruned(self):
+        problem, _ = _meeting_problem()
+        connected = problem.ma_environment.fluent("connected")
+        move = problem.agent("r2").action("move")
+        l_from, l_to = move.parameters
+        move.add_effect(connected(l_to, l_from), True)
+        domains = _parameter_domains(ProblemCentralizer(problem).centralize())
+        self.assertEqual(domains["move_r1"], [None, None, None])
+        self.assert_invalid_move(problem, never_applicable=False)
+
+    def test_supported_kind_is_a_copy(self):
+        engine = MAPlanValidator[SequentialPlanValidator]
+        engine.supported_kind().unset_problem_class("ACTION_BASED_MULTI_AGENT")
+        self.assertTrue(engine.supported_kind().has_action_based_multi_agent())
+        problem_kind = ProblemKind(version=2)
+        problem_kind.set_problem_class("ACTION_BASED_MULTI_AGENT")
+        problem_kind.set_conditions_kind("EQUALITIES")
+        self.assertTrue(engine.supports(problem_kind))
+        problem_kind.set_time("CONTINUOUS_TIME")
+        self.assertFalse(engine.supports(problem_kind))
+
+
+class TestLinearizations(unittest.TestCase):
+    """Checks the linearizations explored against all_sequential_plans()."""
+
+    def setUp(self):
+        up.shortcuts.get_environment().credits_stream = None
+        test_case = get_example_problems()["ma-loader"]
+        valid_plan = test_case.valid_plans[0]
+        self.cases = [
+            (
+                test_case.problem,
+                _random_pops(valid_plan, 10) + _relaxed_pops(valid_plan, 20),
+            ),
+            _switching_agents(),
+        ]
+        self.validator = MAPlanValidator[SequentialPlanValidator]()
+        self.engine = SequentialPlanValidator()
+
+    def is_valid(self, pddl_problem, plan):
+        status = self.engine.validate(pddl_problem, plan).status
+        return status == ValidationResultStatus.VALID
+
+    def test_threat_first_linearizations(self):
+        validator = MAPlanValidator[_Validator]()
+        for problem, pops in self.cases:
+            pddl_problem, plan_converter, _, _ = self.validator._centralize(problem)
+            verdicts = set()
+            for pop in pops:
+                new_pop = plan_converter.convert_pop_plan(pop)
+                all_plans = list(new_pop.all_sequential_plans())
+                linearizations = list(
+                    _threat_first_linearizations(pddl_problem, new_pop)
+                )
+                orders = [tuple(p.actions) for p in linearizations]
+                self.assertEqual(len(set(orders)), len(orders))
+                self.assertLessEqual(set(orders), {tuple(p.actions) for p in all_plans})
+                expected = all(self.is_valid(pddl_problem, p) for p in all_plans)
+                self.assertEqual(
+                    all(self.is_valid(pddl_problem, p) for p in linearizations),
+                    expected,
+                )
+                status = validator.validate(problem, pop).status
+                self.assertEqual(status == ValidationResultStatus.VALID, expected)
+                verdicts.add(expected)
+            self.assertEqual(verdicts, {True, False})
+
+    def test_find_invalid_linearization(self):
+        for problem, pops in self.cases:
+            pddl_problem, plan_converter, _, simulator = self.validator._centralize(
+                problem
+            )
+            self.assertIsNotNone(simulator)
+            verdicts = set()
+            for pop in pops:
+                new_pop = plan_converter.convert_pop_plan(pop)
+                all_plans = list(new_pop.all_sequential_plans())
+                expected = all(self.is_valid(pddl_problem, p) for p in all_plans)
+                invalid = _find_invalid_linearization(pddl_problem, new_pop, simulator)
+                self.assertEqual(invalid is None, expected)
+                if invalid is not None:
+                    self.assertIn(
+                        tuple(invalid.actions), {tuple(p.actions) for p in all_plans}
+                    )
+                    self.assertFalse(self.is_valid(pddl_problem, invalid))
+                status = self.validator.validate(problem, pop).status
+                self.assertEqual(status == ValidationResultStatus.VALID, expected)
+                verdicts.add(expected)
+            self.assertEqual(verdicts, {True, False})
+
+class TestInterferences(unittest.TestCase):
+    def setUp(self):
+        location = UserType("location")
+        self.visited = Fluent("visited", BoolType(), at=location)
+        self.counter = Fluent("counter", IntType())
+        self.l1, self.l2 = Object("l1", location), Object("l2", location)
+
+        visit = InstantaneousAction("visit", at=location)
+        visit.add_effect(self.visited(visit.parameter("at")), True)
+        check = InstantaneousAction("check", at=location)
+        check.add_precondition(self.visited(check.parameter("at")))
+        check_any = InstantaneousAction("check_any")
+        somewhere = Variable("somewhere", location)
+        check_any.add_precondition(Exists(self.visited(somewhere), somewhere))
+        count = InstantaneousAction("count")
+        count.add_increase_effect(self.counter, 1)
+        reset = InstantaneousAction("reset")
+        reset.add_effect(self.counter, 0)
+        self.actions = {a.name: a for a in (visit, check, check_any, count, reset)}
+
+    def step(self, name, *params):
+        return ActionInstance(self.actions[name], params)
+
+    def assert_independent(self, adjacency_list, independent):
+        self.assertEqual(
+            _has_independent_linearizations(PartialOrderPlan(adjacency_list)),
+            independent,
+        )
+
+    def test_write_read_by_unordered_step(self):
+        visit, check = self.step("visit", self.l1), self.step("check", self.l1)
+        self.assert_independent({visit: [], check: []}, False)
+        self.assert_independent({visit: [check], check: []}, True)
+
+    def test_different_groundings(self):
+        visit, check = self.step("visit", self.l1), self.step("check", self.l2)
+        self.assert_independent({visit: [], check: []}, True)
+
+    def test_quantified_variable_matches_every_grounding(self):
+        check_any = self.step("check_any")
+        read, written = _fluent_accesses(check_any)
+        self.assertEqual(read, {(self.visited, None)})
+        self.assertEqual(written, set())
+        visit = self.step("visit", self.l1)
+        self.assert_independent({visit: [], check_any: []}, False)
+
+    def test_increase_reads_the_fluent(self):
+        counter_key = (self.counter, ())
+        read, written = _fluent_accesses(self.step("count"))
+        self.assertEqual((read, written), ({counter_key}, {counter_key}))
+        read, written = _fluent_accesses(self.step("reset"))
+        self.assertEqual((read, written), (set(), {counter_key}))
+        first, second = self.step("count"), self.step("count")
+        self.assert_independent({first: [], second: []}, False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+import random
+import unittest
+from unittest import mock
+
+import unified_planning as up
+from unified_planning.shortcuts import (
+    BoolType,
+    Dot,
+    Fluent,
+    InstantaneousAction,
+    Object,
+    UserType,
+)
+from unified_planning.model.multi_agent import Agent, MultiAgentProblem
+from unified_planning.engines.plan_validator import SequentialPlanValidator
+from unified_planning.engines.results import ValidationResultStatus
+from unified_planning.plans import ActionInstance, PartialOrderPlan
+from unified_planning.test.examples.multi_agent import get_example_problems
+
+from ma_plan_validator.ma_plan_validator import MAPlanValidator, ProblemCentralizer
+
+
+def _random_pops(sequential_plan, count, seed=0):
+    """Partial order plans over the actions of the plan: half of them keep
+    its order, adding random shortcuts, the others shuffle it and keep
+    random orderings."""
+    rng = random.Random(seed)
+    actions = list(sequential_plan.actions)
+    pops = []
+    for i in range(count):
+        keep_order = i % 2 == 0
+        order = actions[:] if keep_order else rng.sample(actions, len(actions))
+        adjacency_list = {ai: [] for ai in order}
+        for j, ai in enumerate(order):
+            for k, successor in enumerate(order[j + 1 :]):
+                if (keep_order and k == 0) or rng.random() < 0.5:
+                    adjacency_list[ai].append(successor)
+        pops.append(PartialOrderPlan(adjacency_list))
+    return pops
+
+
+def _meeting_problem(clashing_parameter=False, connected_default=False):
+    """Two robots moving on a line, r1 meets r2 through a Dot expression on
+    the public fluent of r2."""
+    location = UserType("location")
+    problem = MultiAgentProblem("meeting")
+    connected = Fluent("connected", BoolType(), l_from=location, l_to=location)
+    met = Fluent("met", BoolType())
+    problem.ma_environment.add_fluent(
+        connected, default_initial_value=connected_default
+    )
+    problem.ma_environment.add_fluent(met, default_initial_value=False)
+    locations = [Object(f"l{i}", location) for i in range(1, 4)]
+    problem.add_objects(locations)
+
+    robots = []
+    for name in ("r1", "r2"):
+        robot = Agent(name, problem)
+        pos = Fluent("pos", BoolType(), at=location)
+        robot.add_public_fluent(pos, default_initial_value=False)
+        to_name = name if clashing_parameter else "l_to"
+        move = InstantaneousAction("move", l_from=location, **{to_name: location})
+        l_from, l_to = move.parameters
+        move.add_precondition(pos(l_from))
+        move.add_precondition(connected(l_from, l_to))
+        move.add_effect(pos(l_from), False)
+        move.add_effect(pos(l_to), True)
+        robot.add_action(move)
+        problem.add_agent(robot)
+        robots.append(robot)
+
+    r1, r2 = robots
+    meet = InstantaneousAction("meet", at=location)
+    at = meet.parameter("at")
+    meet.add_precondition(r1.fluent("pos")(at))
+    meet.add_precondition(Dot(r2, r2.fluent("pos")(at)))
+    meet.add_effect(met, True)
+    r1.add_action(meet)
+
+    l1, l2, l3 = locations
+    problem.set_initial_value(connected(l1, l2), True)
+    problem.set_initial_value(connected(l2, l3), True)
+    problem.set_initial_value(Dot(r1, r1.fluent("pos")(l1)), True)
+    problem.set_initial_value(Dot(r2, r2.fluent("pos")(l2)), True)
+    problem.add_goal(met)
+    problem.add_goal(Dot(r2, r2.fluent("pos")(l3)))
+
+    move_r1 = ActionInstance(r1.action("move"), (l1, l2), agent=r1)
+    meet_r1 = ActionInstance(meet, (l2,), agent=r1)
+    move_r2 = ActionInstance(r2.action("move"), (l2, l3), agent=r2)
+    return problem, (move_r1, meet_r1, move_r2)
+
+
+class _FallBack(Exception):
+    pass
+
+
+class TestProblemCentralizer(unittest.TestCase):
+    def setUp(self):
+        up.shortcuts.get_environment().credits_stream = None
+
+    def test_examples_match_ma_pddl(self):
+        examples = get_example_problems()
+        for name in ("ma-basic", "ma-loader"):
+            # ma-basic has a single action, only ma-loader has invalid plans
+            with self.subTest(name):
+                problem = examples[name].problem
+                self.assertIsNotNone(ProblemCentralizer(problem).centralize())
+                pops = _random_pops(examples[name].valid_plans[0], 10)
+                validator = MAPlanValidator[SequentialPlanValidator]()
+                pddl_validator = MAPlanValidator[SequentialPlanValidator]()
+                with mock.patch.object(
+                    ProblemCentralizer, "centralize", return_value=None
+                ):
+                    expected = [pddl_validator.validate(problem, p).status for p in pops]
+                actual = [validator.validate(problem, p).status for p in pops]
+                self.assertEqual(expected, actual)
+                self.assertIn(ValidationResultStatus.VALID, actual)
+
+    def test_dot_expressions_and_agent_fluents(self):
+        # The MA-PDDL writer refers to other agents with undeclared constants,
+        # so this problem can't go through the PDDL round-trip
+        problem, (move_r1, meet_r1, move_r2) = _meeting_problem()
+        centralized = ProblemCentralizer(problem).centralize()
+        self.assertIsNotNone(centralized)
+        meet = centralized.action("meet_r1")
+        pos_r1 = centralized.fluent("a_pos_r1")
+        pos_r2 = centralized.fluent("a_pos_r2")
+        at = meet.parameter("at")
+        self.assertEqual(list(meet.preconditions), [pos_r1(at), pos_r2(at)])
+
+        cases = [
+            ({move_r1: [meet_r1], meet_r1: [move_r2], move_r2: []}, "VALID"),
+            ({move_r1: [meet_r1, move_r2], meet_r1: [], move_r2: []}, "INVALID"),
+            ({move_r2: [move_r1], move_r1: [meet_r1], meet_r1: []}, "INVALID"),
+            ({move_r1: [], meet_r1: [], move_r2: []}, "INVALID"),
+        ]
+        validator = MAPlanValidator[SequentialPlanValidator]()
+        for adjacency_list, status in cases:
+            result = validator.validate(problem, PartialOrderPlan(adjacency_list))
+            self.assertEqual(result.status, ValidationResultStatus[status])
+
+    def assert_falls_back(self, problem):
+        self.assertIsNone(ProblemCentralizer(problem).centralize())
+        validator = MAPlanValidator[SequentialPlanValidator]()
+        with mock.patch.object(
+            MAPlanValidator,
+            "_centralize_with_ma_pddl",
+            autospec=True,
+            side_effect=_FallBack,
+        ) as centralize_with_ma_pddl:
+            with self.assertRaises(_FallBack):
+                validator._centralize(problem)
+        centralize_with_ma_pddl.assert_called_once_with(validator, problem)
+
+    def test_agent_goals_fall_back_to_ma_pddl(self):
+        examples = get_example_problems()
+        problem = examples["ma-basic"].problem.clone()
+        robot = problem.agent("robot")
+        problem.clear_goals()
+        robot.add_public_goal(robot.fluent("pos")(problem.object("l2")))
+        self.assert_falls_back(problem)
+
+    def test_parameter_name_clash_falls_back_to_ma_pddl(self):
+        problem, _ = _meeting_problem(clashing_parameter=True)
+        self.assert_falls_back(problem)
+
+
+if __name__ == "__main__":
+    unittest.main()